@@ -0,0 +1,226 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+from datetime import datetime, date as date_cls
+from multiprocessing import Pool
+
+# Streams log_YYYY-MM-DD.txt(.gz) files written by visa.py's info_logger()
+# ("HH:MM:SS.ffffff:" line followed by the message lines) and prints stats.
+# Usage: python log_analyzer.py [files or dirs ...] [--jobs N] [--json]
+
+FILE_RE = re.compile(r"log_(\d{4}-\d{2}-\d{2})\.txt(\.gz)?$")
+STAMP_RE = re.compile(r"^(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?:$")
+# Gaps longer than this between polls are cooldowns/bans, not polling
+MAX_POLL_GAP = 30 * 60
+
+
+def open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def iter_records(path):
+    # Yields (timestamp match, [message lines]) one record at a time (constant memory)
+    stamp, lines = None, []
+    with open_log(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            m = STAMP_RE.match(line) if line[2:3] == ":" else None
+            if m:
+                if stamp is not None:
+                    yield stamp, lines
+                stamp, lines = m, []
+            elif stamp is not None:
+                lines.append(line)
+    if stamp is not None:
+        yield stamp, lines
+
+
+def to_datetime(day, stamp):
+    # Only built for records that turn into events
+    h, mi, sec, frac = stamp.groups()
+    micro = int((frac or "0").ljust(6, "0"))
+    return datetime(day.year, day.month, day.day, int(h), int(mi), int(sec), micro)
+
+
+def classify(lines):
+    # Maps a record to (event type, payload); only the leading lines are inspected
+    if not lines:
+        return None, None
+    first = lines[0]
+    if first.startswith("Request count:") or (first.startswith("---") and len(lines) > 1 and lines[1].startswith("Request count:")):
+        return "poll", None
+    if first.startswith("Available dates:"):
+        dates = [d.strip() for d in " ".join(lines[1:]).split(",") if d.strip() and d.strip() != "None"]
+        return "availability", dates
+    if first.startswith("List is empty, Probabely banned!"):
+        return "ban", None
+    if first.startswith("Rescheduled Successfully!"):
+        return "booking", "SUCCESS"
+    if first.startswith("Reschedule Failed!!!"):
+        return "booking", "FAIL"
+    if "DRY_RUN=True (no changes made)" in first:
+        return "booking", "FOUND"
+    if first.startswith("Availability fetch failed:"):
+        return "fetch_error", None
+    return None, None
+
+
+def analyze_file(path):
+    # Partial stats for one file; merged by merge_summaries()
+    m = FILE_RE.search(os.path.basename(path))
+    day = date_cls.fromisoformat(m.group(1))
+    summary = {
+        "file": path, "records": 0, "polls": 0, "poll_active_seconds": 0.0,
+        "first_poll": None, "last_poll": None, "bans": [], "fetch_errors": 0,
+        "bookings": {}, "first_seen": {},
+    }
+    first_poll = last_poll = None
+    previous_dates = set()
+    for match, lines in iter_records(path):
+        summary["records"] += 1
+        kind, payload = classify(lines)
+        if kind is None:
+            continue
+        stamp = to_datetime(day, match)
+        if kind == "poll":
+            summary["polls"] += 1
+            if last_poll is not None:
+                gap = (stamp - last_poll).total_seconds()
+                if 0 < gap <= MAX_POLL_GAP:
+                    summary["poll_active_seconds"] += gap
+            first_poll = first_poll or stamp
+            last_poll = stamp
+        elif kind == "availability":
+            current = set(payload)
+            for d in current - previous_dates:
+                if d not in summary["first_seen"]:
+                    summary["first_seen"][d] = stamp.isoformat()
+            previous_dates = current
+        elif kind == "ban":
+            summary["bans"].append(stamp.isoformat())
+            previous_dates = set()
+        elif kind == "booking":
+            summary["bookings"][payload] = summary["bookings"].get(payload, 0) + 1
+        elif kind == "fetch_error":
+            summary["fetch_errors"] += 1
+    if first_poll is not None:
+        summary["first_poll"] = first_poll.isoformat()
+        summary["last_poll"] = last_poll.isoformat()
+    return summary
+
+
+def merge_summaries(summaries):
+    total = {
+        "files": 0, "records": 0, "polls": 0, "poll_active_seconds": 0.0,
+        "first_poll": None, "last_poll": None, "bans": [], "fetch_errors": 0,
+        "bookings": {}, "first_seen": {},
+    }
+    for s in summaries:
+        total["files"] += 1
+        for key in ("records", "polls", "poll_active_seconds", "fetch_errors"):
+            total[key] += s[key]
+        if s["first_poll"] and (total["first_poll"] is None or s["first_poll"] < total["first_poll"]):
+            total["first_poll"] = s["first_poll"]
+        if s["last_poll"] and (total["last_poll"] is None or s["last_poll"] > total["last_poll"]):
+            total["last_poll"] = s["last_poll"]
+        total["bans"].extend(s["bans"])
+        for k, v in s["bookings"].items():
+            total["bookings"][k] = total["bookings"].get(k, 0) + v
+        for d, seen in s["first_seen"].items():
+            if d not in total["first_seen"] or seen < total["first_seen"][d]:
+                total["first_seen"][d] = seen
+    total["bans"].sort()
+    return total
+
+
+def build_report(total):
+    active_hours = total["poll_active_seconds"] / 3600
+    ban_times = [datetime.fromisoformat(b) for b in total["bans"]]
+    gaps = [(b - a).total_seconds() / 3600 for a, b in zip(ban_times, ban_times[1:])]
+    days = len({b.date() for b in ban_times})
+    appearance_hours = {}
+    for seen in total["first_seen"].values():
+        h = datetime.fromisoformat(seen).hour
+        appearance_hours[h] = appearance_hours.get(h, 0) + 1
+    return {
+        "files": total["files"],
+        "records": total["records"],
+        "polls": total["polls"],
+        "first_poll": total["first_poll"],
+        "last_poll": total["last_poll"],
+        "poll_rate_per_hour": (total["polls"] / active_hours) if active_hours else None,
+        "fetch_errors": total["fetch_errors"],
+        "bans": len(ban_times),
+        "days_with_bans": days,
+        "hours_between_bans": {
+            "min": min(gaps) if gaps else None,
+            "mean": sum(gaps) / len(gaps) if gaps else None,
+            "median": sorted(gaps)[len(gaps) // 2] if gaps else None,
+            "max": max(gaps) if gaps else None,
+        },
+        "bookings": total["bookings"],
+        "dates_first_seen": dict(sorted(total["first_seen"].items())),
+        "appearances_by_hour": dict(sorted(appearance_hours.items())),
+    }
+
+
+def print_report(report):
+    fmt = lambda v, spec="{:.2f}": spec.format(v) if v is not None else "n/a"
+    print(f"Files: {report['files']}  Records: {report['records']}")
+    print(f"Polls: {report['polls']} ({report['first_poll']} -> {report['last_poll']})")
+    print(f"Poll rate: {fmt(report['poll_rate_per_hour'])} per active hour")
+    print(f"Fetch errors: {report['fetch_errors']}")
+    gaps = report["hours_between_bans"]
+    print(f"Bans: {report['bans']} on {report['days_with_bans']} days")
+    print(f"Hours between bans: min {fmt(gaps['min'])}, mean {fmt(gaps['mean'])}, median {fmt(gaps['median'])}, max {fmt(gaps['max'])}")
+    print("Booking outcomes: " + (", ".join(f"{k}={v}" for k, v in sorted(report["bookings"].items())) or "none"))
+    print(f"Distinct dates seen: {len(report['dates_first_seen'])}")
+    print("New dates by hour of day: " + (", ".join(f"{h:02d}h={n}" for h, n in report["appearances_by_hour"].items()) or "none"))
+    for d, seen in report["dates_first_seen"].items():
+        print(f"\t{d} first seen {seen}")
+
+
+def collect_files(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            candidates = glob.glob(os.path.join(p, "log_*.txt")) + glob.glob(os.path.join(p, "log_*.txt.gz"))
+        else:
+            candidates = glob.glob(p)
+        files.extend(c for c in candidates if FILE_RE.search(os.path.basename(c)))
+    return sorted(set(files))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stats from visa.py log_YYYY-MM-DD.txt(.gz) files.")
+    parser.add_argument("paths", nargs="*", default=["."], help="log files, globs or directories (default: .)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="files parsed in parallel")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths)
+    if not files:
+        print("No log_YYYY-MM-DD.txt files found.", file=sys.stderr)
+        return 1
+    if args.jobs > 1 and len(files) > 1:
+        with Pool(min(args.jobs, len(files))) as pool:
+            summaries = pool.imap_unordered(analyze_file, files)
+            total = merge_summaries(summaries)
+    else:
+        total = merge_summaries(analyze_file(f) for f in files)
+    report = build_report(total)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
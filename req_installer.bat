@@ -1,4 +1,5 @@
 pip install requests==2.27.1
 pip install selenium==4.2.0
 pip install webdriver-manager==3.7.0
-pip install sendgrid==6.9.7
\ No newline at end of file
+pip install sendgrid==6.9.7
+pip install psutil
\ No newline at end of file
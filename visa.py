@@ -4,6 +4,10 @@ import random
 import os
 import requests
 import configparser
+import tempfile
+import socket
+import struct
+from collections import deque
 from datetime import datetime, timedelta
 
 from selenium import webdriver
@@ -20,6 +24,12 @@ from sendgrid.helpers.mail import Mail
 
 from embassy import *
 
+try:
+    import psutil
+except ImportError:
+    # Listed in requirements.txt; without it the watchdog falls back to the JS heap and age
+    psutil = None
+
 config = configparser.ConfigParser()
 config.read('config.ini')
 
@@ -72,6 +82,11 @@ WORK_LIMIT_TIME = config['TIME'].getfloat('WORK_LIMIT_TIME')
 WORK_COOLDOWN_TIME = config['TIME'].getfloat('WORK_COOLDOWN_TIME')
 # Temporary Banned (empty list): wait COOLDOWN_TIME hours
 BAN_COOLDOWN_TIME = config['TIME'].getfloat('BAN_COOLDOWN_TIME')
+# 401/403 right after logging in again this many times in a row: treat as a ban
+MAX_AUTH_FAILURES = 3
+# Per-request timeouts for in-browser availability fetches (seconds)
+DATE_FETCH_TIMEOUT = config['TIME'].getfloat('DATE_FETCH_TIMEOUT', fallback=15)
+TIME_FETCH_TIMEOUT = config['TIME'].getfloat('TIME_FETCH_TIMEOUT', fallback=10)
 
 # CHROMEDRIVER
 # Details for the script to control Chrome
@@ -79,6 +94,16 @@ LOCAL_USE = config['CHROMEDRIVER'].getboolean('LOCAL_USE')
 # Optional: HUB_ADDRESS is mandatory only when LOCAL_USE = False
 HUB_ADDRESS = config['CHROMEDRIVER']['HUB_ADDRESS']
 PROXY = config['CHROMEDRIVER'].get('PROXY', fallback='').strip()
+# Lean profile: block images/fonts/analytics/cookie banners and cache static assets on disk
+LEAN_PROFILE = config['CHROMEDRIVER'].getboolean('LEAN_PROFILE', fallback=False)
+CHROME_USER_DATA_DIR = config['CHROMEDRIVER'].get('CHROME_USER_DATA_DIR', fallback='').strip()
+# Watchdog: recycle the browser when it grows past DRIVER_MAX_RSS_MB or lives longer than DRIVER_MAX_AGE_HOURS (0 disables)
+DRIVER_MAX_RSS_MB = config['CHROMEDRIVER'].getfloat('DRIVER_MAX_RSS_MB', fallback=1500)
+DRIVER_MAX_AGE_HOURS = config['CHROMEDRIVER'].getfloat('DRIVER_MAX_AGE_HOURS', fallback=6)
+# Remote driver (grid) or no psutil: the process RSS is out of reach, so the page's JS heap is watched instead
+DRIVER_MAX_HEAP_MB = config['CHROMEDRIVER'].getfloat('DRIVER_MAX_HEAP_MB', fallback=512)
+# How many times a crashed browser is replaced before the loop gives up
+MAX_DRIVER_RECOVERIES = config['CHROMEDRIVER'].getint('MAX_DRIVER_RECOVERIES', fallback=3)
 
 # RUN MODE (optional)
 HEADLESS = False
@@ -93,8 +118,64 @@ if config.has_section('RUN'):
     UPDATE_CAS = config['RUN'].getboolean('UPDATE_CAS', fallback=False)
     CAS_OFFSET_DAYS = config['RUN'].getint('CAS_OFFSET_DAYS', fallback=3)
     ALLOW_OUT_OF_PERIOD_FALLBACK = config['RUN'].getboolean('ALLOW_OUT_OF_PERIOD_FALLBACK', fallback=False)
+    SLOT_RACE_BUDGET = config['RUN'].getfloat('SLOT_RACE_BUDGET', fallback=60)
+    SLOT_RACE_BATCH = max(1, config['RUN'].getint('SLOT_RACE_BATCH', fallback=3))
+    WARM_TAB = config['RUN'].getboolean('WARM_TAB', fallback=False)
+    WARM_TAB_REFRESH = config['RUN'].getfloat('WARM_TAB_REFRESH', fallback=600)
+    COMPOSITE_BOOKING = config['RUN'].getboolean('COMPOSITE_BOOKING', fallback=True)
 else:
     ALLOW_OUT_OF_PERIOD_FALLBACK = False
+    # Seconds spent booking the next-best candidates after a slot is taken (0 disables)
+    SLOT_RACE_BUDGET = 60
+    # Candidates whose times are re-fetched together in one round-trip
+    SLOT_RACE_BATCH = 3
+    # Keep a second tab with the appointment form loaded, reloaded every WARM_TAB_REFRESH seconds
+    WARM_TAB = False
+    WARM_TAB_REFRESH = 600
+    # Fill and submit the booking form with one in-page script per phase (False: step by step)
+    COMPOSITE_BOOKING = True
+
+# SHARED AVAILABILITY CACHE (optional)
+# Accounts watching the same facility share one days/{FACILITY_ID}.json fetch
+# through a common directory (e.g. a volume mounted in every container).
+SHARED_CACHE_DIR = ''
+SHARED_CACHE_TTL = 30
+SHARED_CACHE_LOCK_TIMEOUT = 30
+if config.has_section('SHARED_CACHE'):
+    SHARED_CACHE_DIR = config['SHARED_CACHE'].get('SHARED_CACHE_DIR', fallback='').strip()
+    SHARED_CACHE_TTL = config['SHARED_CACHE'].getfloat('SHARED_CACHE_TTL', fallback=30)
+    SHARED_CACHE_LOCK_TIMEOUT = config['SHARED_CACHE'].getfloat('SHARED_CACHE_LOCK_TIMEOUT', fallback=30)
+
+# PROXY POOL (optional)
+# Date polling goes over plain HTTP through these proxies (the browser keeps PROXY),
+# each with its own hourly request budget and ban cooldown.
+PROXY_POOL = []
+PROXY_MAX_REQUESTS_PER_HOUR = 60
+PROXY_BAN_COOLDOWN = BAN_COOLDOWN_TIME
+PROXY_FAIL_COOLDOWN = 10
+if config.has_section('PROXY_POOL'):
+    PROXY_POOL = [p.strip() for p in config['PROXY_POOL'].get('PROXIES', fallback='').split(',') if p.strip()]
+    PROXY_MAX_REQUESTS_PER_HOUR = config['PROXY_POOL'].getint('PROXY_MAX_REQUESTS_PER_HOUR', fallback=60)
+    PROXY_BAN_COOLDOWN = config['PROXY_POOL'].getfloat('PROXY_BAN_COOLDOWN', fallback=BAN_COOLDOWN_TIME)
+    PROXY_FAIL_COOLDOWN = config['PROXY_POOL'].getfloat('PROXY_FAIL_COOLDOWN', fallback=10)
+
+# RELEASE WINDOWS (optional)
+# Cron-like times (minute hour day month weekday, local time) when the consulate
+# usually releases slots. Polling bursts at RELEASE_POLL_INTERVAL inside each window.
+RELEASE_WINDOWS = []
+RELEASE_WINDOW_MINUTES = 10
+RELEASE_WINDOW_LEAD = 120
+RELEASE_POLL_INTERVAL = 5
+RELEASE_MAX_REQUESTS = 120
+NTP_SERVER = ''
+if config.has_section('RELEASE_WINDOW'):
+    RELEASE_WINDOWS = [w.strip() for w in config['RELEASE_WINDOW'].get('RELEASE_WINDOWS', fallback='').split(';') if w.strip()]
+    RELEASE_WINDOW_MINUTES = config['RELEASE_WINDOW'].getint('RELEASE_WINDOW_MINUTES', fallback=10)
+    RELEASE_WINDOW_LEAD = config['RELEASE_WINDOW'].getfloat('RELEASE_WINDOW_LEAD', fallback=120)
+    # Never burst faster than every 2 seconds
+    RELEASE_POLL_INTERVAL = max(2, config['RELEASE_WINDOW'].getfloat('RELEASE_POLL_INTERVAL', fallback=5))
+    RELEASE_MAX_REQUESTS = config['RELEASE_WINDOW'].getint('RELEASE_MAX_REQUESTS', fallback=120)
+    NTP_SERVER = config['RELEASE_WINDOW'].get('NTP_SERVER', fallback='').strip()
 
 SIGN_IN_LINK = f"https://ais.usvisa-info.com/{EMBASSY}/niv/users/sign_in"
 APPOINTMENT_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment"
@@ -107,13 +188,221 @@ CAS_FACILITY_ID = str(CAS_FACILITY_ID or FACILITY_ID)
 CAS_DATE_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/days/{CAS_FACILITY_ID}.json?appointments[expedite]=false"
 CAS_TIME_URL = f"https://ais.usvisa-info.com/{EMBASSY}/niv/schedule/{SCHEDULE_ID}/appointment/times/{CAS_FACILITY_ID}.json?date=%s&appointments[expedite]=false"
 
-JS_SCRIPT = ("var req = new XMLHttpRequest();"
-             f"req.open('GET', '%s', false);"
-             "req.setRequestHeader('Accept', 'application/json, text/javascript, */*; q=0.01');"
-             "req.setRequestHeader('X-Requested-With', 'XMLHttpRequest');"
-             f"req.setRequestHeader('Cookie', '_yatri_session=%s');"
-             "req.send(null);"
-             "return req.responseText;")
+# Resources the login and appointment form do not need (CDP Network.setBlockedURLs patterns)
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*newrelic.com*", "*nr-data.net*",
+    "*onetrust.com*", "*cookielaw.org*", "*cookiebot.com*",
+]
+
+# Runs fetch() in the page (cookies sent by the browser) for several URLs at once.
+# Each request is aborted after arguments[1] ms; resolves with one result per URL.
+ASYNC_FETCH_SCRIPT = """
+var urls = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+function one(url) {
+  var ctrl = new AbortController();
+  var timer = setTimeout(function () { ctrl.abort(); }, timeoutMs);
+  var t0 = performance.now();
+  return fetch(url, {
+    method: 'GET',
+    credentials: 'same-origin',
+    signal: ctrl.signal,
+    headers: {'Accept': 'application/json, text/javascript, */*; q=0.01', 'X-Requested-With': 'XMLHttpRequest'}
+  }).then(function (r) {
+    return r.text().then(function (body) {
+      var headers = {};
+      r.headers.forEach(function (v, k) { headers[k] = v; });
+      return {url: url, status: r.status, headers: headers, body: body, error: null, elapsed_ms: performance.now() - t0};
+    });
+  }).catch(function (e) {
+    return {url: url, status: 0, headers: {}, body: null, error: e.name === 'AbortError' ? 'timeout' : String(e), elapsed_ms: performance.now() - t0};
+  }).finally(function () { clearTimeout(timer); });
+}
+Promise.all(urls.map(one)).then(done);
+"""
+
+
+# True once a time select holds at least one real (non-empty) option
+HAS_TIME_OPTIONS_SCRIPT = """
+var sel = document.getElementById(arguments[0]);
+return !!sel && Array.prototype.some.call(sel.options, function (o) { return o.value.trim(); });
+"""
+
+# Booking form phases, each run as one async script inside the page
+CONSULATE_DATE_SCRIPT = """
+var date = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+function fire(el, type) { el.dispatchEvent(new Event(type, {bubbles: true})); }
+function key(el, type, k) { el.dispatchEvent(new KeyboardEvent(type, {bubbles: true, key: k})); }
+var dateEl = document.getElementById('appointments_consulate_appointment_date');
+var timeEl = document.getElementById('appointments_consulate_appointment_time');
+if (!dateEl || !timeEl) { done({ok: false, error: 'consulate fields not found'}); return; }
+dateEl.scrollIntoView({block: 'center'});
+dateEl.removeAttribute('readonly');
+dateEl.value = date;
+key(dateEl, 'keydown', 'Enter'); key(dateEl, 'keyup', 'Enter');
+key(dateEl, 'keydown', 'Escape');
+dateEl.blur();
+// Drop the previous date's times so only the reloaded ones can be picked
+timeEl.innerHTML = '';
+fire(dateEl, 'change');
+timeEl.scrollIntoView({block: 'center'});
+var t0 = Date.now(), lastSig = null, stableSince = 0;
+(function poll() {
+  var times = Array.prototype.map.call(timeEl.options, function (o) { return o.value; }).filter(function (v) { return v.trim(); });
+  var sig = times.join('|');
+  if (sig !== lastSig) { lastSig = sig; stableSince = Date.now(); }
+  // Reloaded and unchanged for 300 ms, like the step-by-step path's settle
+  if (times.length && !timeEl.disabled && Date.now() - stableSince >= 300) { done({ok: true, times: times, waited_ms: Date.now() - t0}); return; }
+  if (Date.now() - t0 > timeoutMs) { done({ok: false, error: 'no consulate times loaded'}); return; }
+  setTimeout(poll, 100);
+})();
+"""
+
+# Selects the expected time (first non-empty if none given); a missing time is an error
+SELECT_TIME_SCRIPT = """
+var id = arguments[0], expected = arguments[1], done = arguments[arguments.length - 1];
+var sel = document.getElementById(id);
+if (!sel) { done({ok: false, error: id + ' not found'}); return; }
+var values = [];
+for (var i = 0; i < sel.options.length; i++) {
+  var v = sel.options[i].value.trim();
+  if (!v) { continue; }
+  values.push(v);
+  if (!expected || v === expected) {
+    sel.selectedIndex = i;
+    sel.dispatchEvent(new Event('change', {bubbles: true}));
+    done({ok: true, time: v});
+    return;
+  }
+}
+done({ok: false, error: 'time ' + expected + ' not offered (form has: ' + values.join(', ') + ')'});
+"""
+
+CAS_DATE_TIME_SCRIPT = """
+var casDate = arguments[0], casTime = arguments[1], timeoutMs = arguments[2], done = arguments[arguments.length - 1];
+function fire(el, type) { el.dispatchEvent(new Event(type, {bubbles: true})); }
+function key(el, type, k) { el.dispatchEvent(new KeyboardEvent(type, {bubbles: true, key: k})); }
+var dateEl = document.getElementById('appointments_asc_appointment_date');
+var timeEl = document.getElementById('appointments_asc_appointment_time');
+if (!dateEl || !timeEl) { done({ok: false, error: 'CAS fields not found'}); return; }
+// Drop the current CAS times before touching the date so only the reloaded ones can be picked
+timeEl.innerHTML = '';
+dateEl.scrollIntoView({block: 'center'});
+dateEl.removeAttribute('readonly');
+dateEl.value = casDate;
+dateEl.click();
+key(dateEl, 'keydown', 'Enter'); key(dateEl, 'keyup', 'Enter');
+// Emulate picking the day inside the datepicker
+var dayEl = document.querySelector('[data-date="' + casDate + '"]');
+if (dayEl) {
+  dayEl.click();
+} else {
+  var day = String(parseInt(casDate.split('-')[2], 10));
+  var cals = document.querySelectorAll('.ui-datepicker-calendar, .datepicker, .calendar, table[class*="calendar"]');
+  outer: for (var i = 0; i < cals.length; i++) {
+    var links = cals[i].querySelectorAll('a, button, td');
+    for (var j = 0; j < links.length; j++) {
+      if ((links[j].innerText || '').trim() === day) { links[j].click(); break outer; }
+    }
+  }
+}
+fire(dateEl, 'input');
+key(dateEl, 'keydown', 'Escape');
+dateEl.blur();
+fire(dateEl, 'change');
+fire(dateEl, 'change');
+timeEl.scrollIntoView({block: 'center'});
+timeEl.focus();
+var t0 = Date.now(), lastSig = null, stableSince = 0;
+(function poll() {
+  var values = Array.prototype.map.call(timeEl.options, function (o) { return o.value.trim(); });
+  var sig = values.join('|');
+  if (sig !== lastSig) { lastSig = sig; stableSince = Date.now(); }
+  // Reloaded and unchanged for 300 ms (both change events may repopulate the select)
+  if (values.some(function (v) { return v; }) && !timeEl.disabled && Date.now() - stableSince >= 300) {
+    var idx = values.indexOf(casTime);
+    if (idx === -1) { done({ok: false, error: 'CAS time ' + casTime + ' not offered (form has: ' + values.filter(function (v) { return v; }).join(', ') + ')'}); return; }
+    timeEl.selectedIndex = idx;
+    fire(timeEl, 'change');
+    done({ok: true, date: dateEl.value, time: casTime, waited_ms: Date.now() - t0});
+    return;
+  }
+  if (Date.now() - t0 > timeoutMs) { done({ok: false, error: 'no CAS times loaded'}); return; }
+  setTimeout(poll, 100);
+})();
+"""
+
+SUBMIT_CONFIRM_SCRIPT = """
+var enableMs = arguments[0], modalMs = arguments[1], done = arguments[arguments.length - 1];
+var submit = document.getElementById('appointments_submit');
+if (!submit) { done({ok: false, error: 'submit button not found'}); return; }
+var bannerSelector = arguments[2];
+var t0 = Date.now(), submittedAt = null;
+function bannerTexts() {
+  return Array.prototype.map.call(document.querySelectorAll(bannerSelector), function (b) { return (b.innerText || '').trim(); })
+    .filter(function (t) { return t; });
+}
+var bannersBefore = bannerTexts();
+function confirmCandidates() {
+  var found = Array.prototype.slice.call(document.querySelectorAll('a.btn.btn-primary, a.button.alert, a[onclick*="confirm"], a[data-method="post"]'));
+  Array.prototype.forEach.call(document.querySelectorAll('a'), function (a) {
+    if ((a.textContent || '').toLowerCase().indexOf('confirm') !== -1) { found.push(a); }
+  });
+  return found;
+}
+function waitModal() {
+  if (document.querySelector('div[class*="modal"], div[id*="fancybox"], div[role="dialog"]')) {
+    var candidates = confirmCandidates();
+    var confirmEl = candidates[candidates.length - 1];
+    done({ok: true, confirmed: !!confirmEl, since_submit_ms: Date.now() - submittedAt});
+    // Click after replying: confirming navigates away from this page
+    if (confirmEl) {
+      setTimeout(function () { confirmEl.scrollIntoView({block: 'center'}); confirmEl.click(); }, 0);
+    }
+    return;
+  }
+  // An error shown instead of the modal (e.g. slot taken): report it right away
+  var newBanners = bannerTexts().filter(function (t) { return bannersBefore.indexOf(t) === -1; });
+  if (newBanners.length) { done({ok: true, confirmed: false, banners: newBanners, since_submit_ms: Date.now() - submittedAt}); return; }
+  if (Date.now() - submittedAt > modalMs) { done({ok: true, confirmed: false, since_submit_ms: Date.now() - submittedAt}); return; }
+  setTimeout(waitModal, 100);
+}
+(function waitEnabled() {
+  if (!submit.disabled) {
+    submit.scrollIntoView({block: 'center'});
+    submittedAt = Date.now();
+    window.__visaBookingPending = true;
+    submit.click();
+    waitModal();
+    return;
+  }
+  if (Date.now() - t0 > enableMs) { done({ok: false, error: 'submit button stayed disabled'}); return; }
+  setTimeout(waitEnabled, 100);
+})();
+"""
+
+# Banners counted as a booking error once the submit has answered
+BOOKING_ERROR_SELECTOR = '.alert, .flash, .error, .alert-danger'
+
+BOOKING_STATE_SCRIPT = """
+var text = document.body ? document.body.innerText : '';
+var banners = Array.prototype.map.call(document.querySelectorAll(arguments[0]), function (b) { return (b.innerText || '').trim(); })
+  .filter(function (t) { return t; });
+// The marker set before submit disappears once the server answered with a new page
+return {url: location.href, success: text.indexOf('Successfully Scheduled') !== -1 || text.indexOf('Programado exitosamente') !== -1,
+        answered: !window.__visaBookingPending, banners: banners};
+"""
+
+
+class FetchError(Exception):
+    # Availability request timed out, failed or answered with a non-200 status
+    def __init__(self, msg, status=0):
+        super().__init__(msg)
+        self.status = status
+
 
 def send_notification(title, msg):
     print(f"Sending notification!")
@@ -201,9 +490,138 @@ def get_cas_facility_info():
     return str(FACILITY_ID), 'embassy-default'
 
 
+def browser_processes():
+    # chromedriver + the Chrome processes it started (local driver only, needs psutil)
+    if psutil is None or not LOCAL_USE:
+        return []
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return [root] + root.children(recursive=True)
+    except Exception:
+        return []
+
+
+def kill_processes(procs):
+    for p in procs:
+        try:
+            p.kill()
+        except Exception:
+            pass
+    if procs:
+        try:
+            psutil.wait_procs(procs, timeout=5)
+        except Exception:
+            pass
+
+
+def browser_rss_mb():
+    # Sum RSS of chromedriver + Chrome processes
+    procs = browser_processes()
+    if not procs:
+        return None
+    try:
+        return sum(p.memory_info().rss for p in procs) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def browser_heap_mb():
+    # JS heap of the current page; reachable on a remote grid node too (Chrome only)
+    try:
+        used = driver.execute_script("return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;")
+        return used / (1024 * 1024) if used else None
+    except Exception:
+        return None
+
+
+def fmt_mb(value):
+    return f"{value:.0f} MB" if value is not None else "n/a"
+
+
+def python_rss_mb():
+    if psutil is None:
+        return None
+    try:
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def timed_get(url, label):
+    # driver.get with page load time and browser memory logged per profile
+    t_start = time.perf_counter()
+    driver.get(url)
+    elapsed = time.perf_counter() - t_start
+    profile = "lean" if LEAN_PROFILE else "full"
+    msg = f"Page load [{label}]: {elapsed:.2f}s (profile={profile}, browser RSS={fmt_mb(browser_rss_mb())})"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+    return elapsed
+
+
+# Tab kept on the appointment form (fresh CSRF token) for instant booking
+warm_tab = {"handle": None, "polling_handle": None, "loaded_at": 0}
+
+
+def refresh_warm_tab(force=False):
+    # (Re)load the warm tab when missing, consumed or older than WARM_TAB_REFRESH
+    if not WARM_TAB:
+        return
+    if not force and warm_tab["loaded_at"] and time.monotonic() - warm_tab["loaded_at"] < WARM_TAB_REFRESH:
+        return
+    # Remember the polling tab once; a failed booking may have left us on the warm tab
+    polling = warm_tab["polling_handle"] or driver.current_window_handle
+    warm_tab["polling_handle"] = polling
+    try:
+        if warm_tab["handle"] in driver.window_handles:
+            driver.switch_to.window(warm_tab["handle"])
+        else:
+            driver.switch_to.new_window('tab')
+            warm_tab["handle"] = driver.current_window_handle
+        timed_get(APPOINTMENT_URL, "warm tab")
+        ready = bool(driver.find_elements(By.ID, "appointments_consulate_appointment_date"))
+        warm_tab["loaded_at"] = time.monotonic() if ready else 0
+        if not ready:
+            info_logger(LOG_FILE_NAME, "Warm tab: appointment form not found after reload.")
+    except Exception as e:
+        warm_tab["loaded_at"] = 0
+        try:
+            info_logger(LOG_FILE_NAME, f"Warm tab refresh failed: {type(e).__name__}: {e}")
+        except Exception:
+            pass
+    finally:
+        driver.switch_to.window(polling)
+
+
+def use_warm_tab():
+    # Switch to the loaded form for a booking; it is reloaded on the next refresh
+    if not (WARM_TAB and warm_tab["handle"] and warm_tab["loaded_at"]):
+        return False
+    try:
+        driver.switch_to.window(warm_tab["handle"])
+    except Exception:
+        warm_tab["handle"] = None
+        return False
+    warm_tab["loaded_at"] = 0
+    return True
+
+
+def return_to_polling_tab():
+    if WARM_TAB and warm_tab["polling_handle"]:
+        try:
+            driver.switch_to.window(warm_tab["polling_handle"])
+        except Exception:
+            pass
+
+
 def start_process():
+    # A new sign-in replaces the session, so the warm tab's form token is void
+    warm_tab["loaded_at"] = 0
     # Bypass and robust waits: ensure we are on sign_in and fields exist
-    driver.get(SIGN_IN_LINK)
+    timed_get(SIGN_IN_LINK, "sign_in")
     time.sleep(STEP_TIME)
     try:
         Wait(driver, 60).until(lambda d: d.find_elements(By.ID, 'user_email') or d.find_elements(By.NAME, 'commit'))
@@ -271,23 +689,86 @@ def start_process():
     except Exception:
         pass
 
-def reschedule(date):
+# Found-to-submit timing of the booking in progress
+booking_timer = {"found_at": None, "warm_tab": False, "calls_at_found": 0}
+
+# Banner texts meaning the chosen slot was booked by someone else before submit
+SLOT_TAKEN_HINTS = [
+    "no longer available", "not available", "unavailable",
+    "ya no está disponible", "no está disponible", "no disponible",
+]
+
+
+def is_notify_only(date):
     # if cutoff is set and date is before cutoff, force notify-only
     if ASSIGN_CUTOFF:
         try:
             cutoff_dt = datetime.strptime(ASSIGN_CUTOFF, "%Y-%m-%d")
             date_dt = datetime.strptime(date, "%Y-%m-%d")
             if date_dt < cutoff_dt:
-                local_dry = True
-            else:
-                local_dry = DRY_RUN
+                return True
         except Exception:
-            local_dry = DRY_RUN
-    else:
-        local_dry = DRY_RUN
+            pass
+    return DRY_RUN
+
+
+def is_slot_taken(selected_time, banners):
+    if not selected_time:
+        return True
+    blob = " ".join(banners).lower()
+    return any(h in blob for h in SLOT_TAKEN_HINTS)
+
+
+def log_booking_attempt(attempts, date, selected_time, title, latency):
+    attempts.append({"date": date, "time": selected_time, "result": title, "latency": latency})
+    msg = f"Booking attempt {len(attempts)}: {date} {selected_time} -> {title} in {latency:.2f}s"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+
+
+def race_next_candidates(candidates, attempts):
+    # Slot lost the race: book the next-best dates on the page we are already on
+    # (no re-login, no navigation) until one sticks or the time budget runs out.
+    deadline = time.monotonic() + SLOT_RACE_BUDGET
+    remaining = [d for d in candidates if not is_notify_only(d)]
+    title, msg = "FAIL", "Reschedule Failed!!! No fallback candidate could be booked."
+    while remaining and time.monotonic() < deadline:
+        batch, remaining = remaining[:SLOT_RACE_BATCH], remaining[SLOT_RACE_BATCH:]
+        results = browser_fetch_many([TIME_URL % d for d in batch], TIME_FETCH_TIMEOUT)
+        for date, res in zip(batch, results):
+            if time.monotonic() >= deadline:
+                break
+            t_attempt = time.perf_counter()
+            try:
+                times = parse_fetch_result(res).get("available_times") or []
+            except Exception:
+                times = []
+            if not times:
+                log_booking_attempt(attempts, date, None, "NO_TIMES", time.perf_counter() - t_attempt)
+                continue
+            selected_time = times[0]
+            cas_date, cas_time = (get_cas_date_and_time(date, selected_time) if UPDATE_CAS else (None, None))
+            title, msg, banners = submit_appointment_form(date, selected_time, cas_date, cas_time)
+            log_booking_attempt(attempts, date, selected_time, title, time.perf_counter() - t_attempt)
+            if title == "SUCCESS" or not is_slot_taken(selected_time, banners):
+                return [title, msg]
+    return [title, msg]
+
 
-    # Navigate to appointment page early so CAS facility can be detected
-    driver.get(APPOINTMENT_URL)
+def reschedule(date, candidates=None):
+    # candidates: next-best dates from the same poll, tried if this one is taken
+    local_dry = is_notify_only(date)
+
+    booking_timer["found_at"] = time.perf_counter()
+    booking_timer["calls_at_found"] = webdriver_calls["count"]
+    # Dry runs only look at the form; keep the warm tab loaded for a real booking
+    booking_timer["warm_tab"] = False if local_dry else use_warm_tab()
+    if not booking_timer["warm_tab"]:
+        # Navigate to appointment page early so CAS facility can be detected
+        timed_get(APPOINTMENT_URL, "appointment")
     try:
         info_logger(LOG_FILE_NAME, f"Opened appointment page for target date {date}.")
     except Exception:
@@ -318,21 +799,6 @@ def reschedule(date):
                 info_logger(LOG_FILE_NAME, f"CAS selection proposal: date={cas_date}, time={cas_time}.")
         except Exception:
             pass
-    page = driver.page_source
-    # Try to extract hidden inputs from page source
-    def extract_input(name):
-        try:
-            import re
-            # match name='...' or name="..." with value='...' or value="..."
-            m = re.search(rf"name=\s*[\'\"]{name}[\'\"][^>]*value=\s*[\'\"]([^\'\"]+)[\'\"]", page)
-            return m.group(1) if m else None
-        except Exception:
-            return None
-    headers = {
-        "User-Agent": driver.execute_script("return navigator.userAgent;"),
-        "Referer": APPOINTMENT_URL,
-        "Cookie": "_yatri_session=" + driver.get_cookie("_yatri_session")["value"]
-    }
     # Notificar inmediatamente al encontrar cita, antes de intentar reasignar
     pre_msg = f"Date available: {date} {selected_time}."
     try:
@@ -343,51 +809,151 @@ def reschedule(date):
         title = "FOUND"
         msg = f"{pre_msg} DRY_RUN=True (no changes made)."
         return [title, msg]
-    # Fill form via Selenium using provided selectors and submit
+    attempts = []
+    t_attempt = time.perf_counter()
+    if selected_time:
+        title, msg, banners = submit_appointment_form(date, selected_time, cas_date, cas_time)
+    else:
+        title, msg, banners = "FAIL", f"Reschedule Failed!!! {date}: no available times left.", []
+    log_booking_attempt(attempts, date, selected_time, title, time.perf_counter() - t_attempt)
+    if title == "FAIL" and candidates and SLOT_RACE_BUDGET and is_slot_taken(selected_time, banners):
+        title, msg = race_next_candidates(candidates, attempts)
+    if len(attempts) > 1:
+        msg += f" (attempts: {len(attempts)}, total {sum(a['latency'] for a in attempts):.2f}s)"
+    return [title, msg]
+
+
+def submit_appointment_form(date, selected_time, cas_date, cas_time):
+    # Fill form and submit, either as a few composite in-page scripts or step by step.
+    # Returns [title, msg, banners] where banners are the page alerts on failure.
+    calls_at_start = webdriver_calls["count"]
+    banners_txt = []
     try:
-        # Set embassy appointment date via JS (handles readonly/datepicker)
+        if COMPOSITE_BOOKING:
+            early_banners = fill_and_submit_composite(date, selected_time, cas_date, cas_time)
+        else:
+            early_banners = fill_and_submit_stepwise(date, selected_time, cas_date, cas_time)
+        title, msg, banners_txt = detect_booking_result(date, selected_time, cas_date, cas_time, early_banners)
+    except Exception as e:
+        title = "FAIL"
+        msg = f"Reschedule Failed!!! {date} {selected_time}. Exception: {e}"
+        # Save artifacts to aid debugging on exceptions
         try:
-            info_logger(LOG_FILE_NAME, "Setting embassy date field and loading times...")
+            with open("page_debug.html", "w", encoding="utf-8") as f:
+                f.write(driver.page_source)
         except Exception:
             pass
-        cons_date_el = driver.find_element(By.ID, "appointments_consulate_appointment_date")
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", cons_date_el)
-        driver.execute_script("arguments[0].removeAttribute('readonly');", cons_date_el)
-        driver.execute_script("arguments[0].value = arguments[1];", cons_date_el, date)
-        # Press Enter to confirm date selection
         try:
-            from selenium.webdriver.common.keys import Keys
-            cons_date_el.send_keys(Keys.ENTER)
-            # Close any open datepicker by sending ESC and blurring
-            try:
-                cons_date_el.send_keys(Keys.ESCAPE)
-            except Exception:
-                pass
-            try:
-                driver.execute_script("arguments[0].blur();", cons_date_el)
-            except Exception:
-                pass
+            driver.save_screenshot("screenshot.png")
         except Exception:
             pass
-        # Trigger change so times load
-        driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_date_el)
-        # Wait until time select has options
-        cons_time_el = driver.find_element(By.ID, "appointments_consulate_appointment_time")
         try:
-            ActionChains(driver).move_to_element(cons_time_el).perform()
+            info_logger(LOG_FILE_NAME, f"Exception during reschedule: {type(e).__name__}: {e}")
         except Exception:
             pass
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", cons_time_el)
-        Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_consulate_appointment_time")))
-        Wait(driver, 15).until(lambda d: len(d.find_element(By.ID, 'appointments_consulate_appointment_time').find_elements(By.TAG_NAME, 'option')) > 1)
-        time.sleep(0.5)
-        # Seleccionar siempre la primera hora disponible
+    mode = "composite" if COMPOSITE_BOOKING else "stepwise"
+    calls_msg = f"WebDriver round-trips ({mode}): form {webdriver_calls['count'] - calls_at_start}, since found {webdriver_calls['count'] - booking_timer['calls_at_found']}"
+    print(calls_msg)
+    try:
+        info_logger(LOG_FILE_NAME, calls_msg)
+    except Exception:
+        pass
+    return [title, msg, banners_txt]
+
+
+def log_found_to_submit(since_submit=0.0):
+    if booking_timer["found_at"] is None:
+        return
+    elapsed = time.perf_counter() - booking_timer["found_at"] - since_submit
+    msg = f"Found-to-submit: {elapsed:.2f}s (warm tab: {booking_timer['warm_tab']})"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+
+
+def run_booking_phase(label, script, *args):
+    # One async round-trip per phase; the script reports {ok, error, ...}
+    result = driver.execute_async_script(script, *args)
+    try:
+        info_logger(LOG_FILE_NAME, f"Booking phase [{label}]: {result}")
+    except Exception:
+        pass
+    if not result or not result.get("ok"):
+        raise Exception(f"{label} failed: {(result or {}).get('error')}")
+    return result
+
+
+def fill_and_submit_composite(date, selected_time, cas_date, cas_time):
+    run_booking_phase("consulate date", CONSULATE_DATE_SCRIPT, date, 20000)
+    run_booking_phase("consulate time", SELECT_TIME_SCRIPT, "appointments_consulate_appointment_time", selected_time)
+    if UPDATE_CAS and cas_date and cas_time:
+        run_booking_phase("CAS date and time", CAS_DATE_TIME_SCRIPT, cas_date, cas_time, 20000)
+    try:
+        result = run_booking_phase("submit and confirm", SUBMIT_CONFIRM_SCRIPT, 20000, 15000, BOOKING_ERROR_SELECTOR)
+    except Exception as e:
+        # Submit went straight to the server (no confirmation modal) and unloaded the page mid-script
+        if "unloaded" not in str(e):
+            raise
+        try:
+            info_logger(LOG_FILE_NAME, "No confirmation modal detected; page unloaded after submit, proceeding.")
+        except Exception:
+            pass
+        log_found_to_submit()
+        return []
+    log_found_to_submit(result.get("since_submit_ms", 0) / 1000)
+    return result.get("banners") or []
+
+
+def fill_and_submit_stepwise(date, selected_time, cas_date, cas_time):
+    # Set embassy appointment date via JS (handles readonly/datepicker)
+    try:
+        info_logger(LOG_FILE_NAME, "Setting embassy date field and loading times...")
+    except Exception:
+        pass
+    cons_date_el = driver.find_element(By.ID, "appointments_consulate_appointment_date")
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", cons_date_el)
+    driver.execute_script("arguments[0].removeAttribute('readonly');", cons_date_el)
+    driver.execute_script("arguments[0].value = arguments[1];", cons_date_el, date)
+    # Press Enter to confirm date selection
+    try:
+        from selenium.webdriver.common.keys import Keys
+        cons_date_el.send_keys(Keys.ENTER)
+        # Close any open datepicker by sending ESC and blurring
         try:
-            info_logger(LOG_FILE_NAME, "Selecting first available embassy time option.")
+            cons_date_el.send_keys(Keys.ESCAPE)
         except Exception:
             pass
         try:
-            sel = Select(cons_time_el)
+            driver.execute_script("arguments[0].blur();", cons_date_el)
+        except Exception:
+            pass
+    except Exception:
+        pass
+    # Trigger change so times load (previous date's times are dropped first)
+    driver.execute_script("document.getElementById('appointments_consulate_appointment_time').innerHTML = ''; var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_date_el)
+    # Wait until time select has options
+    cons_time_el = driver.find_element(By.ID, "appointments_consulate_appointment_time")
+    try:
+        ActionChains(driver).move_to_element(cons_time_el).perform()
+    except Exception:
+        pass
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", cons_time_el)
+    Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_consulate_appointment_time")))
+    Wait(driver, 15).until(lambda d: d.execute_script(HAS_TIME_OPTIONS_SCRIPT, 'appointments_consulate_appointment_time'))
+    time.sleep(0.5)
+    # Seleccionar siempre la primera hora disponible (la consultada en TIME_URL)
+    try:
+        info_logger(LOG_FILE_NAME, "Selecting first available embassy time option.")
+    except Exception:
+        pass
+    try:
+        sel = Select(cons_time_el)
+        if selected_time:
+            sel.select_by_value(selected_time)
+            driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_time_el)
+        else:
             options = cons_time_el.find_elements(By.TAG_NAME, 'option')
             idx = None
             for i, opt in enumerate(options):
@@ -396,209 +962,221 @@ def reschedule(date):
             if idx is not None:
                 sel.select_by_index(idx)
                 driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_time_el)
+    except Exception:
+        for opt in cons_time_el.find_elements(By.TAG_NAME, "option"):
+            if (opt.get_attribute("value") or "").strip():
+                opt.click();
+                driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_time_el)
+                break
+    # The form must hold the time fetched for this date, not one left from an earlier date
+    chosen = driver.execute_script("return arguments[0].value;", cons_time_el)
+    if selected_time and chosen != selected_time:
+        raise Exception(f"consulate time mismatch: form has {chosen!r}, expected {selected_time!r}")
+    # Optionally set CAS fields
+    if UPDATE_CAS and cas_date and cas_time:
+        try:
+            info_logger(LOG_FILE_NAME, "Setting CAS date field and loading times...")
         except Exception:
-            for opt in cons_time_el.find_elements(By.TAG_NAME, "option"):
-                if (opt.get_attribute("value") or "").strip():
-                    opt.click();
-                    driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", cons_time_el)
-                    break
-        # Optionally set CAS fields
-        if UPDATE_CAS and cas_date and cas_time:
+            pass
+        asc_date_el = driver.find_element(By.ID, "appointments_asc_appointment_date")
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", asc_date_el)
+        driver.execute_script("arguments[0].removeAttribute('readonly');", asc_date_el)
+        driver.execute_script("arguments[0].value = arguments[1];", asc_date_el, cas_date)
+        try:
+            from selenium.webdriver.common.keys import Keys
+            # Ensure focus before sending keys
             try:
-                info_logger(LOG_FILE_NAME, "Setting CAS date field and loading times...")
+                asc_date_el.click()
             except Exception:
                 pass
-            asc_date_el = driver.find_element(By.ID, "appointments_asc_appointment_date")
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", asc_date_el)
-            driver.execute_script("arguments[0].removeAttribute('readonly');", asc_date_el)
-            driver.execute_script("arguments[0].value = arguments[1];", asc_date_el, cas_date)
+            asc_date_el.send_keys(Keys.ENTER)
+            # Some datepickers react to RETURN differently; send both
             try:
-                from selenium.webdriver.common.keys import Keys
-                # Ensure focus before sending keys
-                try:
-                    asc_date_el.click()
-                except Exception:
-                    pass
-                asc_date_el.send_keys(Keys.ENTER)
-                # Some datepickers react to RETURN differently; send both
-                try:
-                    asc_date_el.send_keys(Keys.RETURN)
-                except Exception:
-                    pass
-                # Try clicking the day inside the datepicker to emulate user selection
-                try:
-                    driver.execute_script(
-                        """
-                        (function(targetDate){
-                          // Try data-date=YYYY-MM-DD
-                          var el = document.querySelector('[data-date="'+targetDate+'"]');
-                          if(el){ el.click(); return true; }
-                          // Fallback: find day link by text within visible calendar
-                          var parts = targetDate.split('-');
-                          var day = String(parseInt(parts[2], 10)); // remove leading zero
-                          var cals = document.querySelectorAll('.ui-datepicker-calendar, .datepicker, .calendar, table[class*="calendar"]');
-                          for(var i=0;i<cals.length;i++){
-                            var links = cals[i].querySelectorAll('a, button, td');
-                            for(var j=0;j<links.length;j++){
-                              var t = (links[j].innerText||'').trim();
-                              if(t === day){
-                                links[j].click();
-                                return true;
-                              }
-                            }
-                          }
-                          return false;
-                        })('""" + cas_date + """');
-                        """
-                    )
-                except Exception:
-                    pass
-                # Dispatch input and keyup to mimic typing
-                try:
-                    driver.execute_script("var e=new Event('input', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
-                    driver.execute_script("var e=new KeyboardEvent('keyup', {bubbles:true, key:'Enter'}); arguments[0].dispatchEvent(e);", asc_date_el)
-                except Exception:
-                    pass
-                # Close any open datepicker by sending ESC and blurring
-                try:
-                    asc_date_el.send_keys(Keys.ESCAPE)
-                except Exception:
-                    pass
-                try:
-                    driver.execute_script("arguments[0].blur();", asc_date_el)
-                except Exception:
-                    pass
+                asc_date_el.send_keys(Keys.RETURN)
             except Exception:
                 pass
-            driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
-            # Fire a second change to mimic user interactions in stubborn UIs
+            # Try clicking the day inside the datepicker to emulate user selection
             try:
-                driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
+                driver.execute_script(
+                    """
+                    (function(targetDate){
+                      // Try data-date=YYYY-MM-DD
+                      var el = document.querySelector('[data-date="'+targetDate+'"]');
+                      if(el){ el.click(); return true; }
+                      // Fallback: find day link by text within visible calendar
+                      var parts = targetDate.split('-');
+                      var day = String(parseInt(parts[2], 10)); // remove leading zero
+                      var cals = document.querySelectorAll('.ui-datepicker-calendar, .datepicker, .calendar, table[class*="calendar"]');
+                      for(var i=0;i<cals.length;i++){
+                        var links = cals[i].querySelectorAll('a, button, td');
+                        for(var j=0;j<links.length;j++){
+                          var t = (links[j].innerText||'').trim();
+                          if(t === day){
+                            links[j].click();
+                            return true;
+                          }
+                        }
+                      }
+                      return false;
+                    })('""" + cas_date + """');
+                    """
+                )
             except Exception:
                 pass
-            # Give focus to CAS time select to trigger loading
+            # Dispatch input and keyup to mimic typing
             try:
-                asc_time_el = driver.find_element(By.ID, "appointments_asc_appointment_time")
-                asc_time_el.click()
+                driver.execute_script("var e=new Event('input', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
+                driver.execute_script("var e=new KeyboardEvent('keyup', {bubbles:true, key:'Enter'}); arguments[0].dispatchEvent(e);", asc_date_el)
             except Exception:
                 pass
-            asc_time_el = driver.find_element(By.ID, "appointments_asc_appointment_time")
+            # Close any open datepicker by sending ESC and blurring
             try:
-                ActionChains(driver).move_to_element(asc_time_el).perform()
+                asc_date_el.send_keys(Keys.ESCAPE)
             except Exception:
                 pass
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", asc_time_el)
-            Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_asc_appointment_time")))
-            Wait(driver, 15).until(lambda d: len(d.find_element(By.ID, 'appointments_asc_appointment_time').find_elements(By.TAG_NAME, 'option')) > 1)
-            time.sleep(0.5)
-            # Seleccionar siempre la primera hora disponible para CAS
             try:
-                info_logger(LOG_FILE_NAME, "Selecting first available CAS time option.")
+                driver.execute_script("arguments[0].blur();", asc_date_el)
             except Exception:
                 pass
-            try:
-                sel_cas = Select(asc_time_el)
-                options = asc_time_el.find_elements(By.TAG_NAME, 'option')
-                idx = None
-                for i, opt in enumerate(options):
-                    if (opt.get_attribute('value') or '').strip():
-                        idx = i; break
-                if idx is not None:
-                    sel_cas.select_by_index(idx)
-                    driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_time_el)
-            except Exception:
-                for opt in asc_time_el.find_elements(By.TAG_NAME, "option"):
-                    if (opt.get_attribute("value") or "").strip():
-                        opt.click();
-                        driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_time_el)
-                        break
-        # Submit reprogramar
-        submit_el = driver.find_element(By.ID, "appointments_submit")
+        except Exception:
+            pass
+        driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
+        # Fire a second change to mimic user interactions in stubborn UIs
         try:
-            info_logger(LOG_FILE_NAME, "Clicking Reprogramar button.")
+            driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_date_el)
         except Exception:
             pass
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", submit_el)
-        Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_submit")))
-        clicked = False
+        # Give focus to CAS time select to trigger loading
         try:
-            submit_el.click()
-            clicked = True
+            asc_time_el = driver.find_element(By.ID, "appointments_asc_appointment_time")
+            asc_time_el.click()
+        except Exception:
+            pass
+        asc_time_el = driver.find_element(By.ID, "appointments_asc_appointment_time")
+        try:
+            ActionChains(driver).move_to_element(asc_time_el).perform()
+        except Exception:
+            pass
+        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", asc_time_el)
+        Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_asc_appointment_time")))
+        Wait(driver, 15).until(lambda d: len(d.find_element(By.ID, 'appointments_asc_appointment_time').find_elements(By.TAG_NAME, 'option')) > 1)
+        time.sleep(0.5)
+        # Seleccionar siempre la primera hora disponible para CAS
+        try:
+            info_logger(LOG_FILE_NAME, "Selecting first available CAS time option.")
+        except Exception:
+            pass
+        try:
+            sel_cas = Select(asc_time_el)
+            options = asc_time_el.find_elements(By.TAG_NAME, 'option')
+            idx = None
+            for i, opt in enumerate(options):
+                if (opt.get_attribute('value') or '').strip():
+                    idx = i; break
+            if idx is not None:
+                sel_cas.select_by_index(idx)
+                driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_time_el)
         except Exception:
+            for opt in asc_time_el.find_elements(By.TAG_NAME, "option"):
+                if (opt.get_attribute("value") or "").strip():
+                    opt.click();
+                    driver.execute_script("var e=new Event('change', {bubbles:true}); arguments[0].dispatchEvent(e);", asc_time_el)
+                    break
+    # Submit reprogramar
+    submit_el = driver.find_element(By.ID, "appointments_submit")
+    try:
+        info_logger(LOG_FILE_NAME, "Clicking Reprogramar button.")
+    except Exception:
+        pass
+    # Marker lets detect_booking_result tell the answer page from this one
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'}); window.__visaBookingPending = true;", submit_el)
+    Wait(driver, 20).until(EC.element_to_be_clickable((By.ID, "appointments_submit")))
+    clicked = False
+    try:
+        submit_el.click()
+        clicked = True
+    except Exception:
+        try:
+            driver.execute_script("arguments[0].click();", submit_el)
+            clicked = True
             try:
-                driver.execute_script("arguments[0].click();", submit_el)
-                clicked = True
-                try:
-                    info_logger(LOG_FILE_NAME, "Submit clicked via JS fallback.")
-                except Exception:
-                    pass
+                info_logger(LOG_FILE_NAME, "Submit clicked via JS fallback.")
             except Exception:
                 pass
+        except Exception:
+            pass
+    if clicked:
+        log_found_to_submit()
 
-        # Confirm alert/modal (robust selectors + JS fallback)
-        try:
-            # Wait for any modal with a primary confirm action
-            Wait(driver, 15).until(lambda d: d.find_elements(By.CSS_SELECTOR, 'div[class*="modal"], div[id*="fancybox"], div[role="dialog"]'))
-            confirm_candidates = []
-            confirm_candidates.extend(driver.find_elements(By.CSS_SELECTOR, 'a.btn.btn-primary, a.button.alert, a[onclick*="confirm"], a[data-method="post"]'))
-            confirm_candidates.extend(driver.find_elements(By.XPATH, "//a[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'confirm') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'confirmar')]"))
-            if confirm_candidates:
-                confirm_el = confirm_candidates[-1]
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", confirm_el)
+    # Confirm alert/modal (robust selectors + JS fallback)
+    try:
+        # Wait for any modal with a primary confirm action
+        Wait(driver, 15).until(lambda d: d.find_elements(By.CSS_SELECTOR, 'div[class*="modal"], div[id*="fancybox"], div[role="dialog"]'))
+        confirm_candidates = []
+        confirm_candidates.extend(driver.find_elements(By.CSS_SELECTOR, 'a.btn.btn-primary, a.button.alert, a[onclick*="confirm"], a[data-method="post"]'))
+        confirm_candidates.extend(driver.find_elements(By.XPATH, "//a[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'confirm') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'confirmar')]"))
+        if confirm_candidates:
+            confirm_el = confirm_candidates[-1]
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", confirm_el)
+            try:
+                confirm_el.click()
+            except Exception:
                 try:
-                    confirm_el.click()
-                except Exception:
+                    driver.execute_script("arguments[0].click();", confirm_el)
                     try:
-                        driver.execute_script("arguments[0].click();", confirm_el)
-                        try:
-                            info_logger(LOG_FILE_NAME, "Confirm clicked via JS fallback.")
-                        except Exception:
-                            pass
+                        info_logger(LOG_FILE_NAME, "Confirm clicked via JS fallback.")
                     except Exception:
                         pass
-                try:
-                    info_logger(LOG_FILE_NAME, "Clicked Confirmar in modal.")
                 except Exception:
                     pass
-        except Exception:
-            # If no modal appeared, continue to success detection
             try:
-                info_logger(LOG_FILE_NAME, "No confirmation modal detected; proceeding.")
+                info_logger(LOG_FILE_NAME, "Clicked Confirmar in modal.")
             except Exception:
                 pass
+    except Exception:
+        # If no modal appeared, continue to success detection
+        try:
+            info_logger(LOG_FILE_NAME, "No confirmation modal detected; proceeding.")
+        except Exception:
+            pass
 
-        # Wait and detect success by URL/banners/text
-        success = False
-        end_time = time.time() + 20
-        last_url = driver.current_url
-        while time.time() < end_time:
-            try:
-                if any(s in (driver.current_url or '') for s in ["/appointment/instructions", "/instructions"]):
-                    success = True
-                    break
-                page_after_loop = driver.page_source
-                if ("Successfully Scheduled" in page_after_loop) or ("Programado exitosamente" in page_after_loop):
-                    success = True
-                    break
-            except Exception:
-                pass
-            time.sleep(1)
 
+def detect_booking_result(date, selected_time, cas_date, cas_time, early_banners=None):
+    # Returns [title, msg, banners] once the booking outcome is known.
+    # Stops as soon as the answer page shows an error banner so a slot race can move on.
+    banners_txt = list(early_banners or [])
+    # Wait and detect success by URL/banners/text
+    success = False
+    end_time = time.time() + 20
+    while not banners_txt and time.time() < end_time:
+        try:
+            # URL, success text and banners in one round-trip
+            state = driver.execute_script(BOOKING_STATE_SCRIPT, BOOKING_ERROR_SELECTOR)
+            if any(s in (state["url"] or '') for s in ["/appointment/instructions", "/instructions"]) or state["success"]:
+                success = True
+                break
+            if state["answered"] and state["banners"]:
+                banners_txt = state["banners"]
+                break
+        except Exception:
+            pass
+        time.sleep(0.25)
+
+    if success:
+        title = "SUCCESS"
+        suffix = ""
+        if UPDATE_CAS and cas_date and cas_time:
+            suffix = f"; CAS set to {cas_date} {cas_time}"
+        msg = f"Rescheduled Successfully! {date} {selected_time}{suffix}"
+        try:
+            info_logger(LOG_FILE_NAME, f"Success detected. URL: {state['url']}")
+        except Exception:
+            pass
+    else:
+        title = "FAIL"
         page_after = driver.page_source
-        if success:
-            title = "SUCCESS"
-            suffix = ""
-            if UPDATE_CAS and cas_date and cas_time:
-                suffix = f"; CAS set to {cas_date} {cas_time}"
-            msg = f"Rescheduled Successfully! {date} {selected_time}{suffix}"
-            try:
-                info_logger(LOG_FILE_NAME, f"Success detected. URL: {driver.current_url}")
-            except Exception:
-                pass
-        else:
-            title = "FAIL"
-            # Capture banner messages if present
-            banners_txt = []
+        # Capture banner messages if present (unless already read while waiting)
+        if not banners_txt:
             try:
                 banners = driver.find_elements(By.CSS_SELECTOR, ".alert, .flash, .notice, .error, .alert-success, .alert-danger")
                 for b in banners:
@@ -607,56 +1185,572 @@ def reschedule(date):
                         banners_txt.append(t)
             except Exception:
                 pass
-            snippet = page_after[:400].replace('\n', ' ')
-            banner_blob = (" | Banners: " + " || ".join(banners_txt)) if banners_txt else ""
-            msg = f"Reschedule Failed!!! {date} {selected_time}. URL: {driver.current_url}. Error snippet: {snippet}{banner_blob}"
-            # Persist artifacts for diagnostics
+        snippet = page_after[:400].replace('\n', ' ')
+        banner_blob = (" | Banners: " + " || ".join(banners_txt)) if banners_txt else ""
+        msg = f"Reschedule Failed!!! {date} {selected_time}. URL: {driver.current_url}. Error snippet: {snippet}{banner_blob}"
+        # Persist artifacts for diagnostics
+        try:
+            with open("page_debug.html", "w", encoding="utf-8") as f:
+                f.write(page_after)
+        except Exception:
+            pass
+        try:
+            driver.save_screenshot("screenshot.png")
+        except Exception:
+            pass
+        try:
+            info_logger(LOG_FILE_NAME, "Reschedule failed; page saved to page_debug.html and screenshot.png")
+        except Exception:
+            pass
+    return [title, msg, banners_txt]
+
+
+def browser_fetch_many(urls, timeout):
+    # All URLs are in flight together; one WebDriver round-trip for the batch
+    return driver.execute_async_script(ASYNC_FETCH_SCRIPT, list(urls), int(timeout * 1000))
+
+
+def browser_fetch(url, timeout):
+    return browser_fetch_many([url], timeout)[0]
+
+
+def parse_fetch_result(res):
+    if res.get('error'):
+        raise FetchError(f"GET {res['url']} failed: {res['error']} after {res['elapsed_ms']:.0f} ms")
+    if res['status'] != 200:
+        raise FetchError(f"GET {res['url']} returned HTTP {res['status']}", res['status'])
+    return json.loads(res['body'])
+
+
+def fetch_json(url, timeout):
+    return parse_fetch_result(browser_fetch(url, timeout))
+
+
+# Health of every pooled proxy; "requests" holds monotonic times of the last hour
+proxy_pool = [
+    {"url": p, "requests": deque(), "latency": None, "ok": 0, "fail": 0,
+     "consecutive_fail": 0, "bans": 0, "quarantined_until": 0}
+    for p in PROXY_POOL
+]
+# Values reused by the HTTP poll path (browser user agent, session cookie)
+http_poll_state = {"user_agent": None}
+
+
+def proxy_label(proxy):
+    # Host:port only, never credentials
+    return proxy["url"].rsplit("@", 1)[-1]
+
+
+def proxy_available(proxy, now):
+    while proxy["requests"] and now - proxy["requests"][0] > hour:
+        proxy["requests"].popleft()
+    return now >= proxy["quarantined_until"] and len(proxy["requests"]) < PROXY_MAX_REQUESTS_PER_HOUR
+
+
+def proxy_score(proxy):
+    # Lower is better: spreads load over the hour budget, penalises slow or failing proxies
+    latency = proxy["latency"] or 1.0
+    failure_rate = (proxy["fail"] + 1) / (proxy["ok"] + proxy["fail"] + 2)
+    return (len(proxy["requests"]) + 1) * latency * (1 + 4 * failure_rate)
+
+
+def pick_proxy():
+    now = time.monotonic()
+    candidates = [p for p in proxy_pool if proxy_available(p, now)]
+    return min(candidates, key=proxy_score) if candidates else None
+
+
+def healthy_proxy_count():
+    now = time.monotonic()
+    return sum(1 for p in proxy_pool if now >= p["quarantined_until"])
+
+
+def quarantine_proxy(proxy, seconds, reason):
+    proxy["quarantined_until"] = time.monotonic() + seconds
+    msg = f"Proxy {proxy_label(proxy)} quarantined for {seconds / minute:.0f} minutes ({reason}); healthy: {healthy_proxy_count()}/{len(proxy_pool)}"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+
+
+def record_proxy_result(proxy, latency, ok, banned=False):
+    if ok:
+        proxy["ok"] += 1
+        proxy["consecutive_fail"] = 0
+        # Exponentially weighted latency
+        proxy["latency"] = latency if proxy["latency"] is None else 0.7 * proxy["latency"] + 0.3 * latency
+    else:
+        proxy["fail"] += 1
+        proxy["consecutive_fail"] += 1
+    if banned:
+        proxy["bans"] += 1
+        quarantine_proxy(proxy, PROXY_BAN_COOLDOWN * hour, "empty list, probably banned")
+    elif proxy["consecutive_fail"] >= 3:
+        proxy["consecutive_fail"] = 0
+        quarantine_proxy(proxy, PROXY_FAIL_COOLDOWN * minute, "3 failed requests")
+
+
+def http_fetch_json(url, proxy_url, timeout):
+    # Same request as the in-browser fetch, sent from Python through a proxy with the browser session
+    if http_poll_state["user_agent"] is None:
+        http_poll_state["user_agent"] = driver.execute_script("return navigator.userAgent;")
+    headers = {
+        "User-Agent": http_poll_state["user_agent"],
+        "Referer": APPOINTMENT_URL,
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "X-Requested-With": "XMLHttpRequest",
+    }
+    cookies = {"_yatri_session": driver.get_cookie("_yatri_session")["value"]}
+    try:
+        r = requests.get(url, headers=headers, cookies=cookies, proxies={"http": proxy_url, "https": proxy_url}, timeout=timeout)
+    except requests.RequestException as e:
+        raise FetchError(f"GET {url} via proxy failed: {type(e).__name__}")
+    # Keep the browser on the rotated session cookie
+    new_session = r.cookies.get("_yatri_session")
+    if new_session and new_session != cookies["_yatri_session"]:
+        try:
+            driver.add_cookie({"name": "_yatri_session", "value": new_session, "path": "/"})
+        except Exception:
+            pass
+    if r.status_code != 200:
+        raise FetchError(f"GET {url} via proxy returned HTTP {r.status_code}", r.status_code)
+    return r.json()
+
+
+def fetch_date_via_proxies():
+    # Try the best proxies in turn; an empty list only quarantines that proxy
+    auth_refused = []
+    for _ in range(len(proxy_pool)):
+        proxy = pick_proxy()
+        if proxy is None:
+            break
+        proxy["requests"].append(time.monotonic())
+        t_start = time.perf_counter()
+        try:
+            dates = http_fetch_json(DATE_URL, proxy["url"], DATE_FETCH_TIMEOUT)
+        except FetchError as e:
+            record_proxy_result(proxy, time.perf_counter() - t_start, ok=False)
+            if e.status in (401, 403):
+                # Blocked proxy IP or expired session: rest it briefly and rotate on.
+                # The browser fallback below tells the two apart.
+                quarantine_proxy(proxy, PROXY_FAIL_COOLDOWN * minute, f"HTTP {e.status}")
+                auth_refused.append(proxy)
+            continue
+        except ValueError:
+            record_proxy_result(proxy, time.perf_counter() - t_start, ok=False)
+            continue
+        record_proxy_result(proxy, time.perf_counter() - t_start, ok=True, banned=not dates)
+        if dates:
+            return dates
+    # No proxy left with budget/health: poll from the browser as usual
+    msg = f"No proxy available ({healthy_proxy_count()}/{len(proxy_pool)} healthy); polling from the browser."
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+    try:
+        return fetch_json(DATE_URL, DATE_FETCH_TIMEOUT)
+    except FetchError as e:
+        if e.status in (401, 403) and auth_refused:
+            # The browser is refused too: the session expired, the proxies were fine
+            for proxy in auth_refused:
+                proxy["quarantined_until"] = 0
+                proxy["consecutive_fail"] = 0
+            msg = f"Browser also got HTTP {e.status}: session problem; released {len(auth_refused)} quarantined proxies."
+            print(msg)
             try:
-                with open("page_debug.html", "w", encoding="utf-8") as f:
-                    f.write(page_after)
+                info_logger(LOG_FILE_NAME, msg)
             except Exception:
                 pass
+        raise
+
+
+def fetch_date():
+    # Requesting to get the whole available dates
+    if proxy_pool:
+        return fetch_date_via_proxies()
+    return fetch_json(DATE_URL, DATE_FETCH_TIMEOUT)
+
+
+def proxy_retry_wait(seconds):
+    # Each healthy proxy keeps the configured spacing, so the loop polls that many times faster
+    healthy = healthy_proxy_count()
+    if healthy > 1:
+        return max(2, seconds // healthy)
+    return seconds
+
+
+# Last shared-cache entry consumed by this account (used to detect new dates)
+shared_cache_seen = {"fetched_at": 0, "dates": set()}
+
+
+def facility_cache_path(facility_id):
+    return os.path.join(SHARED_CACHE_DIR, f"days_{EMBASSY}_{facility_id}.json")
+
+
+def read_facility_cache(facility_id):
+    # Returns (fetched_at, dates) or (None, None) if missing/corrupt
+    try:
+        with open(facility_cache_path(facility_id), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return float(entry["fetched_at"]), entry["dates"]
+    except Exception:
+        return None, None
+
+
+def write_facility_cache(facility_id, dates):
+    path = facility_cache_path(facility_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": time.time(), "dates": dates}, f)
+    # Atomic swap so readers never see a half-written file
+    os.replace(tmp, path)
+
+
+def consume_facility_cache(fetched_at, dates):
+    shared_cache_seen["fetched_at"] = fetched_at
+    shared_cache_seen["dates"] = {d.get('date') for d in dates if d.get('date')}
+
+
+def shared_cache_ttl():
+    # Inside a release window a cached list must not be older than the burst interval
+    if RELEASE_WINDOWS and current_window_start(true_now()) is not None:
+        return min(SHARED_CACHE_TTL, RELEASE_POLL_INTERVAL)
+    return SHARED_CACHE_TTL
+
+
+def shared_cache_lock_timeout():
+    # Longest a holder can legitimately fetch: every pooled proxy timing out, then the browser fallback
+    worst_fetch = (len(PROXY_POOL) + 1) * DATE_FETCH_TIMEOUT + 10
+    return max(SHARED_CACHE_LOCK_TIMEOUT, worst_fetch)
+
+
+def acquire_cache_lock(lock_path):
+    # Returns the token written into the lock (host:pid:timestamp), or None if another account holds it
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    token = f"{socket.gethostname()}:{os.getpid()}:{time.time()}"
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def break_stale_cache_lock(lock_path):
+    # Holder died mid-fetch: remove its lock, but only if it is still that same lock
+    try:
+        with open(lock_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        # Empty content: holder crashed before writing its token; fall back to the file age
+        started = float(content.rsplit(":", 1)[1]) if content else os.path.getmtime(lock_path)
+    except (OSError, ValueError, IndexError):
+        return
+    if time.time() - started <= shared_cache_lock_timeout():
+        return
+    # Rename is atomic: only one waiter gets the file, and it can check what it took
+    stale_path = f"{lock_path}.{os.getpid()}.stale"
+    try:
+        os.rename(lock_path, stale_path)
+    except OSError:
+        return
+    try:
+        with open(stale_path, "r", encoding="utf-8") as f:
+            taken = f.read()
+        if taken != content:
+            # A new holder locked in between: put its lock back
             try:
-                driver.save_screenshot("screenshot.png")
-            except Exception:
+                os.link(stale_path, lock_path)
+            except OSError:
                 pass
+        else:
             try:
-                info_logger(LOG_FILE_NAME, "Reschedule failed; page saved to page_debug.html and screenshot.png")
+                info_logger(LOG_FILE_NAME, f"Broke stale shared cache lock ({content or 'no token'}).")
             except Exception:
                 pass
-    except Exception as e:
-        title = "FAIL"
-        msg = f"Reschedule Failed!!! {date} {selected_time}. Exception: {e}"
-        # Save artifacts to aid debugging on exceptions
+    except OSError:
+        pass
+    finally:
         try:
-            with open("page_debug.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
-        except Exception:
+            os.remove(stale_path)
+        except OSError:
             pass
+
+
+def release_cache_lock(lock_path, token):
+    # Only remove the lock if it is still ours
+    try:
+        with open(lock_path, "r", encoding="utf-8") as f:
+            if f.read() != token:
+                return
+        os.remove(lock_path)
+    except OSError:
+        pass
+
+
+def get_date():
+    # Without a shared cache every account polls upstream on its own
+    if not SHARED_CACHE_DIR:
+        return fetch_date()
+    os.makedirs(SHARED_CACHE_DIR, exist_ok=True)
+    lock_path = facility_cache_path(FACILITY_ID) + ".lock"
+    while True:
+        fetched_at, dates = read_facility_cache(FACILITY_ID)
+        if fetched_at and time.time() - fetched_at < shared_cache_ttl():
+            age = time.time() - fetched_at
+            try:
+                info_logger(LOG_FILE_NAME, f"Shared cache hit for facility {FACILITY_ID} (age {age:.1f}s).")
+            except Exception:
+                pass
+            consume_facility_cache(fetched_at, dates)
+            return dates
+        # Coalesce: only the account holding the lock goes upstream, the rest wait for its result
+        token = acquire_cache_lock(lock_path)
+        if token is None:
+            break_stale_cache_lock(lock_path)
+            time.sleep(0.5)
+            continue
         try:
-            driver.save_screenshot("screenshot.png")
-        except Exception:
-            pass
+            dates = fetch_date()
+            # An empty list is a per-account/IP ban signal; never share it
+            if dates:
+                write_facility_cache(FACILITY_ID, dates)
+                consume_facility_cache(time.time(), dates)
+            return dates
+        finally:
+            release_cache_lock(lock_path, token)
+
+
+def wait_for_retry(seconds):
+    # Sleep until the next poll, waking early if another account published new dates
+    if not SHARED_CACHE_DIR:
+        time.sleep(seconds)
+        return
+    end_time = time.time() + seconds
+    while time.time() < end_time:
+        time.sleep(min(1, max(0, end_time - time.time())))
+        fetched_at, dates = read_facility_cache(FACILITY_ID)
+        if not fetched_at or fetched_at <= shared_cache_seen["fetched_at"]:
+            continue
+        new_dates = {d.get('date') for d in dates if d.get('date')} - shared_cache_seen["dates"]
+        if new_dates:
+            try:
+                info_logger(LOG_FILE_NAME, f"Shared cache published new dates: {', '.join(sorted(new_dates))}. Waking up early.")
+            except Exception:
+                pass
+            return
+
+def parse_cron_field(field, lo, hi):
+    # Supports *, lists (1,3), ranges (1-5) and steps (*/15, 0-30/10, 5/10); returns the matching values
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_txt = part.split('/', 1)
+            step = int(step_txt)
+            if step < 1:
+                raise ValueError(f"step must be >= 1 in '{field}'")
+        if part == '*':
+            start, end = lo, hi
+        elif '-' in part:
+            start, end = (int(x) for x in part.split('-', 1))
+        else:
+            start = int(part)
+            end = hi if step > 1 else start
+        if not lo <= start <= end <= hi:
+            raise ValueError(f"'{field}' out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def parse_cron(expr):
+    fields = expr.split()
+    if len(fields) != 5:
+        raise ValueError("expected 5 fields: minute hour day month weekday")
+    minute_f, hour_f, dom_f, month_f, dow_f = fields
+    # Cron weekday: 0 (or 7) = Sunday
+    dows = {d % 7 for d in parse_cron_field(dow_f, 0, 7)}
+    return {
+        "minutes": parse_cron_field(minute_f, 0, 59),
+        "hours": parse_cron_field(hour_f, 0, 23),
+        "doms": parse_cron_field(dom_f, 1, 31),
+        "months": parse_cron_field(month_f, 1, 12),
+        "dows": dows,
+        # Standard cron: when both day fields are restricted, either one may match
+        "day_or": not dom_f.startswith('*') and not dow_f.startswith('*'),
+    }
+
+
+def cron_match(cron, dt):
+    if dt.minute not in cron["minutes"] or dt.hour not in cron["hours"] or dt.month not in cron["months"]:
+        return False
+    dom_ok = dt.day in cron["doms"]
+    dow_ok = (dt.weekday() + 1) % 7 in cron["dows"]
+    return (dom_ok or dow_ok) if cron["day_or"] else (dom_ok and dow_ok)
+
+
+# Parsed once at startup so a malformed entry stops the script right away
+RELEASE_CRONS = []
+for _window in RELEASE_WINDOWS:
+    try:
+        RELEASE_CRONS.append(parse_cron(_window))
+    except ValueError as e:
+        raise ValueError(f"Invalid RELEASE_WINDOWS entry '{_window}': {e}")
+
+
+def ntp_offset(server, timeout=3):
+    # SNTP query; returns (server time - local time) in seconds, or None
+    NTP_DELTA = 2208988800  # 1900-01-01 -> 1970-01-01
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(timeout)
+            t0 = time.time()
+            sock.sendto(b'\x1b' + 47 * b'\0', (server, 123))
+            data, _ = sock.recvfrom(48)
+            t3 = time.time()
+        def ts(offset):
+            sec, frac = struct.unpack('!II', data[offset:offset + 8])
+            return sec - NTP_DELTA + frac / 2 ** 32
+        t1, t2 = ts(32), ts(40)
+        return ((t1 - t0) + (t2 - t3)) / 2
+    except Exception:
+        return None
+
+
+# Wall clock anchored on the monotonic clock, corrected by the NTP offset
+clock_anchor = {"wall": time.time(), "mono": time.monotonic(), "offset": 0.0}
+
+
+def sync_clock():
+    offset = ntp_offset(NTP_SERVER) if NTP_SERVER else None
+    clock_anchor.update(wall=time.time(), mono=time.monotonic(), offset=offset or 0.0)
+    if offset is not None:
         try:
-            info_logger(LOG_FILE_NAME, f"Exception during reschedule: {type(e).__name__}: {e}")
+            info_logger(LOG_FILE_NAME, f"Clock synced with {NTP_SERVER}: offset {offset * 1000:.0f} ms")
         except Exception:
             pass
-    return [title, msg]
 
 
-def get_date():
-    # Requesting to get the whole available dates
-    session = driver.get_cookie("_yatri_session")["value"]
-    script = JS_SCRIPT % (str(DATE_URL), session)
-    content = driver.execute_script(script)
-    return json.loads(content)
+def true_now():
+    return datetime.fromtimestamp(clock_anchor["wall"] + clock_anchor["offset"] + time.monotonic() - clock_anchor["mono"])
+
+
+def current_window_start(now):
+    # Start of the release window containing now, or None
+    base = now.replace(second=0, microsecond=0)
+    for m in range(RELEASE_WINDOW_MINUTES):
+        start = base - timedelta(minutes=m)
+        if any(cron_match(c, start) for c in RELEASE_CRONS):
+            return start
+    return None
+
+
+def next_window_start(now):
+    # First window start after now (searching up to 8 days ahead), or None
+    start = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    for _ in range(8 * 24 * 60):
+        if any(cron_match(c, start) for c in RELEASE_CRONS):
+            return start
+        start += timedelta(minutes=1)
+    return None
+
+
+def seconds_until_next_window():
+    if not RELEASE_WINDOWS:
+        return None
+    now = true_now()
+    start = next_window_start(now)
+    return (start - now).total_seconds() if start else None
+
+
+# Burst bookkeeping for the window in progress
+release_state = {"start": None, "requests": 0, "baseline": set(), "detected_after": None, "last_dates": set(), "next_poll_at": 0}
+
+
+def release_window_tick(dates):
+    # Called after every successful poll. Returns the burst interval while inside
+    # a window (and under its request budget), else None for normal polling.
+    current = {d.get('date') for d in dates if d.get('date')}
+    previous = release_state["last_dates"]
+    release_state["last_dates"] = current
+    if not RELEASE_WINDOWS:
+        return None
+    now = true_now()
+    start = current_window_start(now)
+    if start != release_state["start"] and release_state["start"] is not None:
+        detected = release_state["detected_after"]
+        detected_txt = f"{detected:.1f}s after start" if detected is not None else "none"
+        msg = f"Release window {release_state['start']:%Y-%m-%d %H:%M} ended: {release_state['requests']} polls, new dates detected: {detected_txt}"
+        print(msg)
+        info_logger(LOG_FILE_NAME, msg)
+        release_state["start"] = None
+    if start is None:
+        return None
+    if release_state["start"] is None:
+        release_state.update(start=start, requests=0, baseline=previous, detected_after=None, next_poll_at=time.monotonic())
+    release_state["requests"] += 1
+    if release_state["detected_after"] is None and current - release_state["baseline"]:
+        release_state["detected_after"] = (now - start).total_seconds()
+        msg = f"Release window: new dates {', '.join(sorted(current - release_state['baseline']))} detected {release_state['detected_after']:.1f}s after window start (poll {release_state['requests']})"
+        print(msg)
+        info_logger(LOG_FILE_NAME, msg)
+    if release_state["requests"] >= RELEASE_MAX_REQUESTS:
+        return None
+    return RELEASE_POLL_INTERVAL
+
+
+def next_burst_delay():
+    # Burst polls sit on a fixed monotonic grid (one slot per RELEASE_POLL_INTERVAL), so the
+    # poll itself and the housekeeping around it do not stretch the interval
+    now = time.monotonic()
+    next_at = release_state["next_poll_at"] + RELEASE_POLL_INTERVAL
+    # Overran a slot: take the next free one instead of polling back to back to catch up
+    while next_at < now:
+        next_at += RELEASE_POLL_INTERVAL
+    release_state["next_poll_at"] = next_at
+    return next_at - now
+
+
+def prewarm_for_window():
+    # Ahead of a window: sync the clock, make sure the session is valid and the appointment page is loaded
+    sync_clock()
+    timed_get(APPOINTMENT_URL, "appointment")
+    if "sign_in" in (driver.current_url or ''):
+        start_process()
+        timed_get(APPOINTMENT_URL, "appointment")
+    refresh_warm_tab(force=True)
+    msg = "Release window pre-warmed; session valid, appointment page loaded."
+    print(msg)
+    info_logger(LOG_FILE_NAME, msg)
+
+
+def wait_until_next_poll(seconds):
+    # Normal retry wait, cut short to pre-warm and start polling when a release window opens
+    until_window = seconds_until_next_window()
+    if until_window is None or until_window - RELEASE_WINDOW_LEAD > seconds:
+        wait_for_retry(seconds)
+        return
+    wait_for_retry(max(0, until_window - RELEASE_WINDOW_LEAD))
+    prewarm_for_window()
+    remaining = seconds_until_next_window()
+    if remaining is not None and remaining <= RELEASE_WINDOW_LEAD:
+        time.sleep(remaining)
+
+
+def cooldown_seconds():
+    # Work cooldown, shortened so it never swallows a release window
+    cooldown = WORK_COOLDOWN_TIME * hour
+    until_window = seconds_until_next_window()
+    if until_window is not None:
+        cooldown = max(0, min(cooldown, until_window - RELEASE_WINDOW_LEAD))
+    return cooldown
+
 
 def get_time(date):
-    time_url = TIME_URL % date
-    session = driver.get_cookie("_yatri_session")["value"]
-    script = JS_SCRIPT % (str(time_url), session)
-    content = driver.execute_script(script)
-    data = json.loads(content)
+    data = fetch_json(TIME_URL % date, TIME_FETCH_TIMEOUT)
     times = data.get("available_times") or []
     time = times[0] if times else None
     print(f"Got time successfully! {date} {time}")
@@ -668,12 +1762,11 @@ def get_time(date):
 
 def get_cas_date_and_time(interview_date, interview_time=None):
     try:
-        session = driver.get_cookie("_yatri_session")["value"]
         cas_id, cas_label = get_cas_facility_info()
         # Ensure we have the embassy time to inform CAS query (server expects consulate context)
         if not interview_time:
             try:
-                data_time = json.loads(driver.execute_script(JS_SCRIPT % (str(TIME_URL % interview_date), session)))
+                data_time = fetch_json(TIME_URL % interview_date, TIME_FETCH_TIMEOUT)
                 times_list = data_time.get("available_times") or []
                 interview_time = times_list[0] if times_list else None
             except Exception:
@@ -692,8 +1785,7 @@ def get_cas_date_and_time(interview_date, interview_time=None):
             info_logger(LOG_FILE_NAME, f"CAS days URL: {cas_date_url}")
         except Exception:
             pass
-        content = driver.execute_script(JS_SCRIPT % (str(cas_date_url), session))
-        data = json.loads(content)
+        data = fetch_json(cas_date_url, DATE_FETCH_TIMEOUT)
         available = [d.get('date') for d in data]
         # Debug: print CAS available dates with facility info
         try:
@@ -711,8 +1803,7 @@ def get_cas_date_and_time(interview_date, interview_time=None):
             info_logger(LOG_FILE_NAME, f"CAS times URL: {cas_time_url}")
         except Exception:
             pass
-        content2 = driver.execute_script(JS_SCRIPT % (str(cas_time_url), session))
-        data2 = json.loads(content2)
+        data2 = fetch_json(cas_time_url, TIME_FETCH_TIMEOUT)
         times = data2.get("available_times") or []
         # Debug: print CAS available times for chosen date
         try:
@@ -736,8 +1827,8 @@ def is_logged_in():
     return True
 
 
-def get_available_date(dates):
-    # Evaluation of different available dates (inclusive bounds)
+def get_available_dates(dates):
+    # Evaluation of different available dates (inclusive bounds), best candidate first
     def is_in_period(date, PSD, PED):
         new_date = datetime.strptime(date, "%Y-%m-%d")
         return (PSD <= new_date <= PED)
@@ -750,7 +1841,7 @@ def get_available_date(dates):
         if date and is_in_period(date, PSD, PED):
             in_range.append(date)
     if in_range:
-        return sorted(in_range)[0]  # primera fecha dentro del período
+        return sorted(in_range)  # primera fecha dentro del período primero
     # Fuera de período: respetar flag de fallback
     try:
         all_dates = sorted([d.get('date') for d in dates if d.get('date')])
@@ -758,10 +1849,10 @@ def get_available_date(dates):
         all_dates = []
     if ALLOW_OUT_OF_PERIOD_FALLBACK and all_dates:
         print(f"\n\nNo available dates between ({PSD.date()}) and ({PED.date()})! Fallback enabled → using earliest available.")
-        return all_dates[0]
+        return all_dates
     else:
         print(f"\n\nNo available dates between ({PSD.date()}) and ({PED.date()})! Fallback disabled → ignoring out-of-range dates.")
-        return None
+        return []
 
 
 def info_logger(file_path, log):
@@ -770,49 +1861,228 @@ def info_logger(file_path, log):
         file.write(str(datetime.now().time()) + ":\n" + log + "\n")
 
 
-chrome_options = webdriver.ChromeOptions()
-if HEADLESS:
-    chrome_options.add_argument("--headless=new")
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--window-size=1920,1080")
-chrome_options.add_argument("--lang=es-CO")
-chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36")
-chrome_options.add_argument("--force-device-scale-factor=0.85")
-chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-chrome_options.add_experimental_option('useAutomationExtension', False)
-if os.environ.get('CHROME_BIN'):
-    chrome_options.binary_location = os.environ['CHROME_BIN']
-if PROXY:
-    try:
-        chrome_options.add_argument(f"--proxy-server={PROXY}")
+def chrome_user_data_dir(fresh=False):
+    # Profile dir passed to Chrome (None: Chrome's own temporary profile).
+    # fresh: a new throwaway dir, for when the usual one is still locked by a stuck browser
+    if not (LEAN_PROFILE or CHROME_USER_DATA_DIR):
+        return None
+    if fresh:
+        return tempfile.mkdtemp(prefix=f"visa_chrome_{SCHEDULE_ID}_")
+    # Persistent profile keeps JS/CSS in the disk cache between runs
+    return CHROME_USER_DATA_DIR or os.path.join(tempfile.gettempdir(), f"visa_chrome_{SCHEDULE_ID}")
+
+
+def build_chrome_options(fresh_profile=False):
+    chrome_options = webdriver.ChromeOptions()
+    if HEADLESS:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--lang=es-CO")
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36")
+    if LEAN_PROFILE:
+        # Smaller viewport at native scale: less to lay out and raster
+        chrome_options.add_argument("--window-size=1280,900")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--disable-background-networking")
+        chrome_options.add_argument("--disable-component-update")
+        chrome_options.add_argument("--disable-default-apps")
+        chrome_options.add_argument("--disable-sync")
+        chrome_options.add_argument("--mute-audio")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+    else:
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument("--force-device-scale-factor=0.85")
+    user_data_dir = chrome_user_data_dir(fresh_profile)
+    if user_data_dir:
+        chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if os.environ.get('CHROME_BIN'):
+        chrome_options.binary_location = os.environ['CHROME_BIN']
+    if PROXY:
+        try:
+            chrome_options.add_argument(f"--proxy-server={PROXY}")
+        except Exception:
+            pass
+    return chrome_options
+
+
+def enable_resource_blocking(new_driver):
+    # Drop non-essential requests at the network layer (CDP is only exposed by the local driver)
+    if not hasattr(new_driver, "execute_cdp_cmd"):
+        print("Lean profile: CDP not available on remote driver; relying on Chrome flags only.")
+        return
+    try:
+        new_driver.execute_cdp_cmd("Network.enable", {})
+        new_driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    except Exception as e:
+        print(f"Lean profile: could not set blocked URLs: {e}")
+
+
+# WebDriver commands sent so far (all drivers)
+webdriver_calls = {"count": 0}
+
+
+def create_driver(fresh_profile=False):
+    chrome_options = build_chrome_options(fresh_profile)
+    if LOCAL_USE:
+        # Use Selenium Manager (selenium >= 4.6) to auto-manage ChromeDriver
+        new_driver = webdriver.Chrome(options=chrome_options)
+    else:
+        new_driver = webdriver.Remote(command_executor=HUB_ADDRESS, options=chrome_options)
+    # Async fetches and booking phases stop themselves; the script timeout is only a backstop
+    new_driver.set_script_timeout(max(DATE_FETCH_TIMEOUT, TIME_FETCH_TIMEOUT, 40) + 5)
+    # Count WebDriver commands (each one is a network hop on a remote grid)
+    original_execute = new_driver.execute
+    def counted_execute(driver_command, params=None):
+        webdriver_calls["count"] += 1
+        return original_execute(driver_command, params)
+    new_driver.execute = counted_execute
+    if LEAN_PROFILE:
+        enable_resource_blocking(new_driver)
+    return new_driver
+
+
+driver = create_driver()
+driver_created_at = time.monotonic()
+
+
+def driver_alive():
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def recycle_driver(reason):
+    # Replace the browser, carrying the session cookies over so no new login is needed.
+    # Returns True if the new browser is still logged in.
+    global driver, driver_created_at
+    procs = browser_processes()
+    before = browser_rss_mb()
+    cookies = []
+    try:
+        cookies = driver.get_cookies()
+    except Exception:
+        pass
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    # A failed quit can leave Chrome running and holding the profile dir lock
+    kill_processes(procs)
+    try:
+        driver = create_driver()
+    except Exception as e:
+        msg = f"New driver failed ({type(e).__name__}: {e}); retrying with a fresh profile dir."
+        print(msg)
+        try:
+            info_logger(LOG_FILE_NAME, msg)
+        except Exception:
+            pass
+        driver = create_driver(fresh_profile=True)
+    driver_created_at = time.monotonic()
+    warm_tab.update(handle=None, polling_handle=None, loaded_at=0)
+    logged_in = False
+    if cookies:
+        try:
+            # Cookies can only be added for the domain currently loaded
+            driver.get(f"https://ais.usvisa-info.com/{EMBASSY}/niv")
+            for c in cookies:
+                c.pop('sameSite', None)
+                try:
+                    driver.add_cookie(c)
+                except Exception:
+                    pass
+            timed_get(APPOINTMENT_URL, "appointment")
+            logged_in = "sign_in" not in (driver.current_url or '')
+        except Exception:
+            logged_in = False
+    after = browser_rss_mb()
+    msg = f"Driver recycled ({reason}). Browser RSS {fmt_mb(before)} -> {fmt_mb(after)}; cookies moved: {len(cookies)}; session kept: {logged_in}"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
     except Exception:
         pass
+    return logged_in
 
-if LOCAL_USE:
-    # Use Selenium Manager (selenium >= 4.6) to auto-manage ChromeDriver
-    driver = webdriver.Chrome(options=chrome_options)
-else:
-    driver = webdriver.Remote(command_executor=HUB_ADDRESS, options=chrome_options)
+
+# Set once the "RSS recycling disabled" notice has been logged
+watchdog_state = {"rss_notice": False}
+
+
+def check_driver_health():
+    # Sample memory, log the trend and recycle the driver when over budget.
+    # Returns False if the recycled driver needs a new login.
+    browser_rss = browser_rss_mb()
+    heap = browser_heap_mb()
+    py_rss = python_rss_mb()
+    age_h = (time.monotonic() - driver_created_at) / hour
+    if browser_rss is None and not watchdog_state["rss_notice"]:
+        watchdog_state["rss_notice"] = True
+        why = "remote driver" if not LOCAL_USE else "psutil not installed"
+        msg = f"Watchdog: browser RSS unavailable ({why}); recycling on JS heap > {DRIVER_MAX_HEAP_MB:.0f} MB and age only."
+        print(msg)
+        try:
+            info_logger(LOG_FILE_NAME, msg)
+        except Exception:
+            pass
+    parts = []
+    if browser_rss is not None:
+        parts.append(f"browser={fmt_mb(browser_rss)}")
+    parts.append(f"js heap={fmt_mb(heap)}")
+    if py_rss is not None:
+        parts.append(f"python={fmt_mb(py_rss)}")
+    msg = f"Memory: {', '.join(parts)}, driver age={age_h:.2f} h"
+    print(msg)
+    try:
+        info_logger(LOG_FILE_NAME, msg)
+    except Exception:
+        pass
+    if DRIVER_MAX_RSS_MB and browser_rss is not None and browser_rss > DRIVER_MAX_RSS_MB:
+        return recycle_driver(f"browser RSS {browser_rss:.0f} MB > {DRIVER_MAX_RSS_MB:.0f} MB")
+    if DRIVER_MAX_HEAP_MB and browser_rss is None and heap is not None and heap > DRIVER_MAX_HEAP_MB:
+        return recycle_driver(f"JS heap {heap:.0f} MB > {DRIVER_MAX_HEAP_MB:.0f} MB")
+    if DRIVER_MAX_AGE_HOURS and age_h > DRIVER_MAX_AGE_HOURS:
+        return recycle_driver(f"driver age {age_h:.2f} h > {DRIVER_MAX_AGE_HOURS} h")
+    return True
 
 
 if __name__ == "__main__":
     first_loop = True
+    driver_recoveries = 0
+    auth_failures = 0
     while 1:
         LOG_FILE_NAME = "log_" + str(datetime.now().date()) + ".txt"
-        if first_loop:
-            t0 = time.time()
-            total_time = 0
-            Req_count = 0
-            start_process()
-            first_loop = False
-        Req_count += 1
         try:
+            # Inside the try so a browser crash during (re)login goes through recovery too
+            if first_loop:
+                t0 = time.time()
+                total_time = 0
+                Req_count = 0
+                start_process()
+                first_loop = False
+            Req_count += 1
+            if not check_driver_health():
+                start_process()
+            if release_state["start"] is None:
+                # Pre-warmed before the window; a reload mid-window would delay the burst
+                refresh_warm_tab()
             msg = "-" * 60 + f"\nRequest count: {Req_count}, Log time: {datetime.today()}\n"
             print(msg)
             info_logger(LOG_FILE_NAME, msg)
             dates = get_date()
+            # A working poll ends the crash and auth-failure streaks; only back-to-back ones count
+            driver_recoveries = 0
+            auth_failures = 0
             if not dates:
                 # Ban Situation
                 msg = f"List is empty, Probabely banned!\n\tSleep for {BAN_COOLDOWN_TIME} hours!\n"
@@ -832,10 +2102,12 @@ if __name__ == "__main__":
                 msg = "Available dates:\n"+ msg
                 print(msg)
                 info_logger(LOG_FILE_NAME, msg)
-                date = get_available_date(dates)
-                if date:
-                    # A good date to schedule for
-                    END_MSG_TITLE, msg = reschedule(date)
+                burst_interval = release_window_tick(dates)
+                candidates = get_available_dates(dates)
+                if candidates:
+                    # A good date to schedule for; the rest are fallbacks if it gets taken
+                    END_MSG_TITLE, msg = reschedule(candidates[0], candidates[1:])
+                    return_to_polling_tab()
                     print(msg)
                     info_logger(LOG_FILE_NAME, msg)
                     if ONE_SHOT:
@@ -844,6 +2116,7 @@ if __name__ == "__main__":
                     RETRY_WAIT_TIME = random.randint(int(RETRY_TIME_L_BOUND), int(RETRY_TIME_U_BOUND))
                 except Exception:
                     RETRY_WAIT_TIME = 60
+                RETRY_WAIT_TIME = proxy_retry_wait(RETRY_WAIT_TIME)
                 t1 = time.time()
                 total_time = t1 - t0
                 msg = "\nWorking Time:  ~ {:.2f} minutes".format(total_time/minute)
@@ -853,17 +2126,70 @@ if __name__ == "__main__":
                     END_MSG_TITLE = "DONE"
                     msg = "ONE_SHOT=True: Finished single iteration."
                     break
-                if total_time > WORK_LIMIT_TIME * hour:
+                if burst_interval:
+                    # Inside a release window: bounded high-rate polling, no cooldown
+                    delay = next_burst_delay()
+                    msg = f"Release window burst: next poll in {delay:.2f} seconds"
+                    print(msg)
+                    info_logger(LOG_FILE_NAME, msg)
+                    time.sleep(delay)
+                elif total_time > WORK_LIMIT_TIME * hour:
                     # Let program rest a little
                     driver.get(SIGN_OUT_LINK)
-                    time.sleep(WORK_COOLDOWN_TIME * hour)
+                    time.sleep(cooldown_seconds())
                     first_loop = True
                 else:
                     msg = "Retry Wait Time: "+ str(RETRY_WAIT_TIME)+ " seconds"
                     print(msg)
                     info_logger(LOG_FILE_NAME, msg)
+                    wait_until_next_poll(RETRY_WAIT_TIME)
+        except FetchError as e:
+            # Slow/failed availability request: skip this poll instead of exiting
+            msg = f"Availability fetch failed: {e}"
+            print(msg)
+            info_logger(LOG_FILE_NAME, msg)
+            try:
+                RETRY_WAIT_TIME = random.randint(int(RETRY_TIME_L_BOUND), int(RETRY_TIME_U_BOUND))
+            except Exception:
+                RETRY_WAIT_TIME = 60
+            if e.status in (401, 403):
+                auth_failures += 1
+                if auth_failures >= MAX_AUTH_FAILURES:
+                    # Still refused after fresh logins: the IP is blocked, not the session
+                    msg = f"Refused {auth_failures} times in a row after logging in, Probabely banned!\n\tSleep for {BAN_COOLDOWN_TIME} hours!\n"
+                    print(msg)
+                    info_logger(LOG_FILE_NAME, msg)
+                    try:
+                        driver.get(SIGN_OUT_LINK)
+                    except Exception:
+                        pass
+                    if ONE_SHOT:
+                        END_MSG_TITLE = "BAN"
+                        break
+                    time.sleep(BAN_COOLDOWN_TIME * hour)
+                    auth_failures = 0
+                else:
+                    # Session expired: log in again after the usual wait
+                    msg = f"Logging in again in {RETRY_WAIT_TIME} seconds ({auth_failures}/{MAX_AUTH_FAILURES})."
+                    print(msg)
+                    info_logger(LOG_FILE_NAME, msg)
                     time.sleep(RETRY_WAIT_TIME)
+                first_loop = True
+                continue
+            wait_for_retry(RETRY_WAIT_TIME)
         except Exception as e:
+            # Browser crashed or was OOM-killed: replace it instead of exiting
+            if not driver_alive() and driver_recoveries < MAX_DRIVER_RECOVERIES:
+                driver_recoveries += 1
+                msg = f"Driver died ({type(e).__name__}: {e}); recovering ({driver_recoveries}/{MAX_DRIVER_RECOVERIES})."
+                print(msg)
+                info_logger(LOG_FILE_NAME, msg)
+                try:
+                    if not recycle_driver("driver died"):
+                        first_loop = True
+                    continue
+                except Exception as recycle_error:
+                    e = recycle_error
             # Exception occurred after finding dates or during reschedule
             END_MSG_TITLE = "EXCEPTION"
             msg = f"Break the loop after exception! {type(e).__name__}: {e}\n"